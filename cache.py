@@ -0,0 +1,75 @@
+"""
+Cache Module - On-disk memoization of LLM and image generation results.
+Entries are keyed by a SHA-256 hash of the model and request parameters.
+"""
+import os
+import logging
+import glob
+import json
+import shutil
+import hashlib
+from typing import Any, Optional
+from config import CACHE_DIR
+
+logger = logging.getLogger("text2ppt")
+
+_enabled = True
+
+
+def set_enabled(enabled: bool):
+    """Enable or disable cache lookups and writes for this process."""
+    global _enabled
+    _enabled = enabled
+
+
+def cache_key(*parts: Any) -> str:
+    """Build a stable cache key from the given request parameters."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_json(key: str) -> Optional[Any]:
+    """Return the cached JSON value for key, or None on a miss."""
+    if not _enabled:
+        return None
+
+    try:
+        with open(os.path.join(CACHE_DIR, f"{key}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def put_json(key: str, value: Any):
+    """Store a JSON-serializable value under key."""
+    if not _enabled:
+        return
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(os.path.join(CACHE_DIR, f"{key}.json"), 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+    except OSError as e:
+        logger.warning("Failed to write cache entry: %s", e)
+
+
+def get_file(key: str) -> Optional[str]:
+    """Return the path of the cached file for key, or None on a miss."""
+    if not _enabled:
+        return None
+
+    matches = glob.glob(os.path.join(CACHE_DIR, f"{key}.*"))
+    return matches[0] if matches else None
+
+
+def put_file(key: str, path: str):
+    """Copy a file into the cache under key, keeping its extension."""
+    if not _enabled:
+        return
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        ext = os.path.splitext(path)[1]
+        shutil.copyfile(path, os.path.join(CACHE_DIR, f"{key}{ext}"))
+    except OSError as e:
+        logger.warning("Failed to write cache entry: %s", e)
@@ -2,6 +2,10 @@
 Configuration module for Text2PPT project.
 """
 import os
+import sys
+import logging
+import importlib.util
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,16 +15,22 @@ load_dotenv()
 ARK_API_KEY = os.environ.get("ARK_API_KEY")
 ARK_BASE_URL = "https://ark.cn-beijing.volces.com/api/v3"
 
+# Connection pool size shared by all HTTP clients talking to Ark
+HTTP_POOL_SIZE = 32
+# Multiplex requests over one HTTP/2 connection when h2 is installed;
+# httpx falls back to HTTP/1.1 on the pool above if the server lacks h2
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
 # Model Endpoints
 LLM_ENDPOINT = os.environ.get("LLM_ENDPOINT", "ep-xxxxxxxxxx")  # Seed 2.0
 IMAGE_ENDPOINT = os.environ.get("IMAGE_ENDPOINT", "ep-xxxxxxxxxx")  # Seadream 4.5
 
-# Output directories
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output")
-IMAGES_DIR = os.path.join(OUTPUT_DIR, "images")
+# Output directories, resolved once at import
+_HERE = Path(__file__).resolve().parent
+OUTPUT_DIR = _HERE / "output"
+IMAGES_DIR = OUTPUT_DIR / "images"
+CACHE_DIR = OUTPUT_DIR / ".cache"
 
-# Ensure output directories exist
-os.makedirs(IMAGES_DIR, exist_ok=True)
 
 # PPT Configuration
 PPT_WIDTH_INCHES = 13.333  # Standard widescreen 16:9
@@ -31,3 +41,27 @@ SLIDE_HEIGHT = PPT_HEIGHT_INCHES  # Alias for convenience
 # Image generation settings
 IMAGE_RATIO = "16:9"
 IMAGE_SIZE = "1920x1080"
+# Requested image size per slide role. Seadream 4.5 rejects images under
+# 3686400 pixels (2560x1440); on endpoints without that limit, set
+# IMAGE_CONTENT_SIZE=1920x1080 to cut bytes for content and closing slides
+IMAGE_SIZE_BY_ROLE = {
+    "cover": "2560x1440",
+    "content": os.environ.get("IMAGE_CONTENT_SIZE", "2560x1440"),
+    "closing": os.environ.get("IMAGE_CONTENT_SIZE", "2560x1440"),
+}
+# Maximum concurrent image generation requests
+ARK_CONCURRENCY = int(os.environ.get("ARK_CONCURRENCY", "6"))
+
+
+def ensure_dirs():
+    """Create the output directories if they do not exist yet."""
+    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def setup_logging():
+    """
+    Send progress logging to stdout, as the print() calls it replaced did.
+    httpx logs every request at INFO, so it is limited to warnings.
+    """
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
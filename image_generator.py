@@ -3,37 +3,170 @@ Image Generator Module - Handles image generation using Seadream 4.5.
 Uses OpenAI-compatible API for Volcengine Ark.
 """
 import os
+import logging
+import json
 import time
-import base64
+import shutil
+import asyncio
+import threading
+import functools
+import weakref
+import aiohttp
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Any, Optional
 from openai import OpenAI
-from config import ARK_API_KEY, ARK_BASE_URL, IMAGE_ENDPOINT, IMAGES_DIR
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+try:
+    import pybase64 as base64  # SIMD-accelerated decoder
+except ImportError:
+    import base64
+import cache
+from config import ARK_API_KEY, ARK_BASE_URL, IMAGE_ENDPOINT, IMAGES_DIR, ensure_dirs, HTTP_POOL_SIZE, HTTP2_ENABLED, IMAGE_SIZE_BY_ROLE, ARK_CONCURRENCY, setup_logging
+
+logger = logging.getLogger("text2ppt")
+
+# Shared session so raw API calls reuse keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+
+
+# Process-wide cap on blocking generate_image() calls, so thread pools such
+# as the web server's stay within ARK_CONCURRENCY in-flight Ark requests
+_SYNC_LIMIT = threading.BoundedSemaphore(ARK_CONCURRENCY)
+
+
+def size_for_slide(slide: Dict[str, Any]) -> str:
+    """Image size to request for a slide, based on its role."""
+    return IMAGE_SIZE_BY_ROLE.get(slide.get('role', 'content'), IMAGE_SIZE_BY_ROLE["content"])
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Retry rate-limited (429) and server-side (5xx) API failures."""
+    return isinstance(exc, aiohttp.ClientResponseError) and (exc.status == 429 or exc.status >= 500)
+
+
+def _sniff_ext(head: bytes) -> Optional[str]:
+    """
+    Detect the image file extension from the first 12 bytes of its data.
+    Accepts bytes or a memoryview so callers can peek without copying.
+    """
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if head[:3] == b'\xff\xd8\xff':
+        return 'jpg'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _write_file(filepath: str, data) -> None:
+    """
+    Write a bytes-like object to filepath with unbuffered os-level writes,
+    preallocating the file where the platform supports it.
+    """
+    view = memoryview(data)
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        if hasattr(os, 'posix_fallocate') and len(view):
+            try:
+                os.posix_fallocate(fd, 0, len(view))
+            except OSError:
+                pass  # Not supported by this filesystem
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+
+@functools.lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Return the process-wide pooled HTTP client, creating it on first use."""
+    return httpx.Client(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_POOL_SIZE
+        )
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    """Return the process-wide Ark image client, creating it on first use."""
+    return OpenAI(
+        api_key=ARK_API_KEY,
+        base_url=ARK_BASE_URL,
+        http_client=get_http_client()
+    )
 
 
 class ImageGenerator:
     """Client for generating images using Seadream 4.5 text-to-image model."""
     
     def __init__(self):
-        self.client = OpenAI(
-            api_key=ARK_API_KEY,
-            base_url=ARK_BASE_URL
-        )
+        ensure_dirs()
+        self._http_client = get_http_client()
+        self.client = get_client()
         self.endpoint = IMAGE_ENDPOINT
+        self._semaphores = weakref.WeakKeyDictionary()
 
-    def generate_image(self, prompt: str, output_filename: str) -> Optional[str]:
+    def generate_image(self, prompt: str, output_filename: str, size: Optional[str] = None) -> Optional[str]:
         """
         Generate a single image from a text prompt.
         
         Args:
             prompt: Text prompt describing the image to generate
             output_filename: Name for the output file (without extension)
+            size: Image size as "WIDTHxHEIGHT" (default: the content slide size)
             
         Returns:
             Path to the saved image file, or None if generation failed
         """
-        print(f"Generating image: {output_filename}", flush=True)
-        print(f"Prompt: {prompt[:100]}...", flush=True)
+        size = size or IMAGE_SIZE_BY_ROLE["content"]
+        key = self._cache_key(prompt, size)
+        cached_path = self._load_cached_image(key, output_filename)
+        if cached_path:
+            return cached_path
+        
+        with _SYNC_LIMIT:
+            image_path = self._generate_image_sdk(prompt, output_filename, size)
+        if image_path:
+            cache.put_file(key, image_path)
+        return image_path
+
+    def _cache_key(self, prompt: str, size: str) -> str:
+        """Cache key for an image generated from prompt with the current settings."""
+        return cache.cache_key("image", self.endpoint, prompt, size)
+
+    def _load_cached_image(self, key: str, output_filename: str) -> Optional[str]:
+        """
+        Copy a cached image to the images directory, returning its path on a hit.
+        """
+        cached_path = cache.get_file(key)
+        if not cached_path:
+            return None
+        
+        ext = os.path.splitext(cached_path)[1]
+        filepath = os.path.join(IMAGES_DIR, f"{output_filename}{ext}")
+        try:
+            shutil.copyfile(cached_path, filepath)
+        except OSError as e:
+            logger.warning("Failed to read cached image: %s", e)
+            return None
+        
+        logger.info("Image loaded from cache: %s", filepath)
+        return filepath
+
+    def _generate_image_sdk(self, prompt: str, output_filename: str, size: str) -> Optional[str]:
+        """
+        Generate an image through the OpenAI SDK, falling back to the raw API.
+        """
+        logger.info("Generating image: %s", output_filename)
+        logger.info("Prompt: %s...", prompt[:100])
         
         try:
             # Use with_raw_response to get headers including request ID
@@ -41,8 +174,8 @@ class ImageGenerator:
                 model=self.endpoint,
                 prompt=prompt,
                 n=1,
-                size="2560x1440",  # Higher resolution for Seadream 4.5 (min 3686400 pixels)
-                response_format="b64_json",
+                size=size,
+                response_format="url",  # Download raw bytes instead of base64
                 extra_body={
                     "watermark": False  # Disable AI watermark
                 }
@@ -50,8 +183,8 @@ class ImageGenerator:
             
             # Extract request ID from headers
             request_id = raw_response.headers.get('x-request-id', 'N/A')
-            print(f"[ImageGen] Request ID: {request_id}", flush=True)
-            print(f"[ImageGen] Model: {self.endpoint}", flush=True)
+            logger.info("[ImageGen] Request ID: %s", request_id)
+            logger.info("[ImageGen] Model: %s", self.endpoint)
             
             # Parse the response
             response = raw_response.parse()
@@ -59,21 +192,21 @@ class ImageGenerator:
             if response.data and len(response.data) > 0:
                 image_data = response.data[0]
                 
-                # Handle base64 encoded image
-                if hasattr(image_data, 'b64_json') and image_data.b64_json:
-                    return self._save_base64_image(image_data.b64_json, output_filename)
-                elif hasattr(image_data, 'url') and image_data.url:
+                # Prefer URL download, fall back to base64 if the server inlined it
+                if hasattr(image_data, 'url') and image_data.url:
                     return self._download_and_save_image(image_data.url, output_filename)
+                elif hasattr(image_data, 'b64_json') and image_data.b64_json:
+                    return self._save_base64_image(image_data.b64_json, output_filename)
             
-            print("No image data in response", flush=True)
+            logger.warning("No image data in response")
             return None
                     
         except Exception as e:
-            print(f"Error generating image: {e}", flush=True)
+            logger.error("Error generating image: %s", e)
             # Try alternative method using raw API call
-            return self._generate_image_raw_api(prompt, output_filename)
+            return self._generate_image_raw_api(prompt, output_filename, size)
 
-    def _generate_image_raw_api(self, prompt: str, output_filename: str) -> Optional[str]:
+    def _generate_image_raw_api(self, prompt: str, output_filename: str, size: str) -> Optional[str]:
         """
         Alternative method using raw HTTP API call for image generation.
         Some Volcengine models may not follow OpenAI's exact API format.
@@ -86,56 +219,59 @@ class ImageGenerator:
             
             # Try visual generation endpoint
             url = f"{ARK_BASE_URL}/images/generations"
-            payload = {
-                "model": self.endpoint,
-                "prompt": prompt,
-                "n": 1,
-                "size": "2560x1440",
-                "response_format": "b64_json",
-                "watermark": False  # Disable AI watermark
-            }
+            payload = self._generation_payload(prompt, size)
             
-            response = requests.post(url, headers=headers, json=payload, timeout=300)
+            response = _SESSION.post(url, headers=headers, json=payload, timeout=300)
             
             if response.status_code == 200:
                 data = response.json()
                 if "data" in data and len(data["data"]) > 0:
-                    b64_data = data["data"][0].get("b64_json") or data["data"][0].get("image")
-                    if b64_data:
-                        return self._save_base64_image(b64_data, output_filename)
-                    
                     url_data = data["data"][0].get("url")
                     if url_data:
                         return self._download_and_save_image(url_data, output_filename)
+                    
+                    b64_data = data["data"][0].get("b64_json") or data["data"][0].get("image")
+                    if b64_data:
+                        return self._save_base64_image(b64_data, output_filename)
             else:
-                print(f"Raw API call failed: {response.status_code} - {response.text[:200]}")
+                logger.error("Raw API call failed: %s - %s", response.status_code, response.text[:200])
                 
         except Exception as e:
-            print(f"Raw API call error: {e}")
+            logger.error("Raw API call error: %s", e)
             
         return None
 
     def _download_and_save_image(self, url: str, output_filename: str) -> Optional[str]:
         """
-        Download image from URL and save to file.
+        Download image from URL into a buffer sized from Content-Length,
+        then write it to file in one call.
         """
         try:
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-            
-            # Determine file extension from content type
-            content_type = response.headers.get('content-type', 'image/png')
-            ext = 'png' if 'png' in content_type else 'jpg'
+            with self._http_client.stream("GET", url, timeout=60) as response:
+                response.raise_for_status()
+                
+                buf = bytearray(int(response.headers.get('content-length', 0)))
+                size = 0
+                for chunk in response.iter_bytes(chunk_size=1 << 20):
+                    # Slice assignment grows the buffer if the length was missing or encoded
+                    buf[size:size + len(chunk)] = chunk
+                    size += len(chunk)
+                del buf[size:]
+                
+                # Detect format from magic bytes, falling back to content type
+                ext = _sniff_ext(memoryview(buf)[:12])
+                if not ext:
+                    content_type = response.headers.get('content-type', 'image/png')
+                    ext = 'png' if 'png' in content_type else 'jpg'
             
             filepath = os.path.join(IMAGES_DIR, f"{output_filename}.{ext}")
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            _write_file(filepath, buf)
             
-            print(f"Image saved: {filepath}")
+            logger.info("Image saved: %s", filepath)
             return filepath
             
         except Exception as e:
-            print(f"Error downloading image: {e}")
+            logger.error("Error downloading image: %s", e)
             return None
 
     def _save_base64_image(self, b64_data: str, output_filename: str) -> Optional[str]:
@@ -147,56 +283,239 @@ class ImageGenerator:
             if ',' in b64_data:
                 b64_data = b64_data.split(',')[1]
             
-            image_bytes = base64.b64decode(b64_data)
+            image_bytes = base64.b64decode(b64_data, validate=False)
             
-            # Detect image format from magic bytes
-            ext = 'png'
-            if image_bytes[:3] == b'\xff\xd8\xff':
-                ext = 'jpg'
+            # Detect image format from magic bytes without copying the buffer
+            ext = _sniff_ext(memoryview(image_bytes)[:12]) or 'png'
             
             filepath = os.path.join(IMAGES_DIR, f"{output_filename}.{ext}")
-            with open(filepath, 'wb') as f:
-                f.write(image_bytes)
+            _write_file(filepath, image_bytes)
             
-            print(f"Image saved: {filepath}")
+            logger.info("Image saved: %s", filepath)
             return filepath
             
         except Exception as e:
-            print(f"Error saving base64 image: {e}")
+            logger.error("Error saving base64 image: %s", e)
             return None
 
-    def generate_slides_images(self, slides: List[Dict[str, Any]], batch_name: str = "ppt") -> List[str]:
+    async def _generate_image_async(
+        self,
+        session: aiohttp.ClientSession,
+        prompt: str,
+        output_filename: str,
+        size: Optional[str] = None
+    ) -> Optional[str]:
         """
-        Generate images for all slides.
+        Async counterpart of generate_image, used to generate many
+        images concurrently over a shared aiohttp session.
+        """
+        size = size or IMAGE_SIZE_BY_ROLE["content"]
+        key = self._cache_key(prompt, size)
+        cached_path = await asyncio.to_thread(self._load_cached_image, key, output_filename)
+        if cached_path:
+            return cached_path
+        
+        image_path = await self._request_image_async(session, prompt, output_filename, size)
+        if image_path:
+            await asyncio.to_thread(cache.put_file, key, image_path)
+        return image_path
+
+    async def _request_image_async(
+        self,
+        session: aiohttp.ClientSession,
+        prompt: str,
+        output_filename: str,
+        size: str
+    ) -> Optional[str]:
+        """
+        Async counterpart of _generate_image_raw_api.
+        """
+        logger.info("Generating image: %s", output_filename)
+        logger.info("Prompt: %s...", prompt[:100])
+        
+        try:
+            data = await self._post_generation_async(session, self._generation_payload(prompt, size))
+            if "data" in data and len(data["data"]) > 0:
+                return await self._save_image_item_async(data["data"][0], output_filename)
+            
+            logger.warning("No image data in response")
+            
+        except aiohttp.ClientResponseError as e:
+            logger.error("Async API call failed: %s - %s", e.status, e.message)
+        except Exception as e:
+            logger.error("Async API call error: %s", e)
+            
+        return None
+
+    def _generation_payload(self, prompt: str, size: str) -> Dict[str, Any]:
+        """Build the JSON body for an image generation request."""
+        return {
+            "model": self.endpoint,
+            "prompt": prompt,
+            "n": 1,
+            "size": size,
+            "response_format": "url",
+            "watermark": False  # Disable AI watermark
+        }
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """
+        Semaphore limiting in-flight API calls to ARK_CONCURRENCY.
+        One is kept per event loop since asyncio primitives are loop-bound.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(ARK_CONCURRENCY)
+        return semaphore
+
+    @retry(
+        retry=retry_if_exception(_is_retryable),
+        wait=wait_exponential(multiplier=1, max=30),
+        stop=stop_after_attempt(5),
+        reraise=True
+    )
+    async def _post_generation_async(
+        self,
+        session: aiohttp.ClientSession,
+        payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        POST an image generation request and return the parsed response.
+        
+        At most ARK_CONCURRENCY requests are in flight at once, and
+        429/5xx responses are retried with exponential backoff.
+        
+        Raises:
+            aiohttp.ClientResponseError: If the API returns a non-200 status
+        """
+        headers = {
+            "Authorization": f"Bearer {ARK_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        
+        url = f"{ARK_BASE_URL}/images/generations"
+        async with self._semaphore():
+            async with session.post(url, headers=headers, json=payload) as response:
+                body = await response.read()
+                if response.status != 200:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info,
+                        response.history,
+                        status=response.status,
+                        message=body[:200].decode('utf-8', errors='replace'),
+                        headers=response.headers
+                    )
+        
+        return json.loads(body)
+
+    async def _save_image_item_async(self, item: Dict[str, Any], output_filename: str) -> Optional[str]:
+        """
+        Save one entry of a generation response's data array.
+        """
+        # Downloading and writing block, so keep them off the event loop
+        url_data = item.get("url")
+        if url_data:
+            return await asyncio.to_thread(self._download_and_save_image, url_data, output_filename)
+        
+        b64_data = item.get("b64_json") or item.get("image")
+        if b64_data:
+            return await asyncio.to_thread(self._save_base64_image, b64_data, output_filename)
+        
+        logger.warning("No image data for %s", output_filename)
+        return None
+
+    async def generate_slide_image_async(
+        self,
+        session: aiohttp.ClientSession,
+        slide: Dict[str, Any],
+        batch_name: str,
+        index: int = 0
+    ) -> Optional[str]:
+        """
+        Generate the background image for one slide and record its path on the slide.
         
         Args:
-            slides: List of slide dictionaries containing image_prompt
+            session: Session from new_session(), shared by concurrent calls
+            slide: Slide dictionary containing image_prompt
             batch_name: Prefix for output filenames
+            index: Zero-based position of the slide, used if it has no slide_number
             
         Returns:
-            List of paths to generated images
+            Path to the saved image file, or None if generation failed
         """
-        image_paths = []
+        slide_num = slide.get('slide_number', index + 1)
+        prompt = slide.get('image_prompt', '')
         
-        for i, slide in enumerate(slides):
-            slide_num = slide.get('slide_number', i + 1)
-            prompt = slide.get('image_prompt', '')
-            
-            if not prompt:
-                print(f"Warning: No image prompt for slide {slide_num}")
-                continue
-            
-            output_filename = f"{batch_name}_slide_{slide_num:02d}"
-            image_path = self.generate_image(prompt, output_filename)
+        if not prompt:
+            logger.warning("No image prompt for slide %s", slide_num)
+            return None
+        
+        output_filename = f"{batch_name}_slide_{slide_num:02d}"
+        image_path = await self._generate_image_async(session, prompt, output_filename, size_for_slide(slide))
+        
+        if image_path:
+            slide['image_path'] = image_path
+        else:
+            logger.warning("Failed to generate image for slide %s", slide_num)
+        
+        return image_path
+
+    def new_session(self) -> aiohttp.ClientSession:
+        """
+        Create an aiohttp session for a set of concurrent image requests.
+        
+        Use it as an async context manager around generate_slide_image_async calls.
+        """
+        return aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300))
+
+    async def generate_slides_images_async(
+        self,
+        slides: List[Dict[str, Any]],
+        batch_name: str = "ppt"
+    ) -> List[str]:
+        """
+        Generate images for all slides concurrently.
+        
+        Args:
+            slides: List of slide dictionaries containing image_prompt
+            batch_name: Prefix for output filenames
             
-            if image_path:
-                image_paths.append(image_path)
-                slide['image_path'] = image_path
-            else:
-                print(f"Warning: Failed to generate image for slide {slide_num}")
+        Returns:
+            List of paths to generated images, in slide order
+        """
+        async with self.new_session() as session:
+            results = await asyncio.gather(
+                *(self.generate_slide_image_async(session, slide, batch_name, i)
+                  for i, slide in enumerate(slides)),
+                return_exceptions=True
+            )
+        
+        image_paths = []
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning("Image generation raised: %s", result)
+            elif result:
+                image_paths.append(result)
         
         return image_paths
 
+    def generate_slides_images(self, slides: List[Dict[str, Any]], batch_name: str = "ppt") -> List[str]:
+        """
+        Generate images for all slides.
+        
+        All requests are issued concurrently, so the total time is roughly
+        that of the slowest image rather than the sum of all of them.
+        
+        Args:
+            slides: List of slide dictionaries containing image_prompt
+            batch_name: Prefix for output filenames
+            
+        Returns:
+            List of paths to generated images
+        """
+        return asyncio.run(self.generate_slides_images_async(slides, batch_name))
+
 
 def test_image_generator():
     """Test function for image generator."""
@@ -218,4 +537,5 @@ def test_image_generator():
 
 
 if __name__ == "__main__":
+    setup_logging()
     test_image_generator()
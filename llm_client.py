@@ -2,60 +2,47 @@
 LLM Client Module - Handles communication with Seed 2.0 for PPT content generation.
 Uses OpenAI-compatible API for Volcengine Ark.
 """
-import json
-from typing import List, Dict, Any
-from openai import OpenAI
-from config import ARK_API_KEY, ARK_BASE_URL, LLM_ENDPOINT
+import re
+import logging
+import functools
+import orjson
+from typing import List, Dict, Any, AsyncIterator
+import httpx
+from openai import OpenAI, AsyncOpenAI
+import cache
+from config import ARK_API_KEY, ARK_BASE_URL, LLM_ENDPOINT, HTTP_POOL_SIZE, HTTP2_ENABLED, setup_logging
 
+logger = logging.getLogger("text2ppt")
 
-class LLMClient:
-    """Client for interacting with Seed 2.0 language model via OpenAI-compatible API."""
-    
-    def __init__(self):
-        self.client = OpenAI(
-            api_key=ARK_API_KEY,
-            base_url=ARK_BASE_URL
-        )
-        self.endpoint = LLM_ENDPOINT
+# Sampling temperature for structure generation; part of the cache key
+_TEMPERATURE = 0.7
 
-    def generate_ppt_structure(self, user_input: str, num_slides: int = 5, language: str = "中文") -> List[Dict[str, Any]]:
-        """
-        Generate PPT structure from user input text.
-        
-        Args:
-            user_input: The user's text input describing the PPT topic
-            num_slides: Number of slides to generate (default: 5)
-            language: Output language for titles and content (default: "中文")
-            
-        Returns:
-            List of slide dictionaries with title, content, and image_prompt
-        """
-        # Determine language-specific instructions
-        if language == "中文":
-            lang_instruction = """
+# Markdown code fence the model sometimes wraps its JSON in
+_FENCE_RE = re.compile(r"^```(?:json)?\s*\n(.*?)(?:\n?```)?\s*$", re.S)
+
+# Language-specific output instructions, keyed by the language option
+_LANG_INSTRUCTIONS = {
+    "中文": """
 【重要】语言要求：
 - title（标题）必须使用中文
 - content（内容要点）必须使用中文
-- image_prompt 保持英文（因为文生图模型用英文效果更好），但要在提示词中包含中文标题的英文翻译"""
-        elif language == "English":
-            lang_instruction = """
+- image_prompt 保持英文（因为文生图模型用英文效果更好），但要在提示词中包含中文标题的英文翻译""",
+    "English": """
 【IMPORTANT】Language Requirements:
 - title must be in English
 - content must be in English  
-- image_prompt must be in English with the English title embedded"""
-        elif language == "日本語":
-            lang_instruction = """
+- image_prompt must be in English with the English title embedded""",
+    "日本語": """
 【重要】言語要件：
 - title（タイトル）は日本語で記述
 - content（内容）は日本語で記述
-- image_promptは英語で記述（タイトルの英訳を含める）"""
-        else:
-            lang_instruction = f"请使用{language}生成标题和内容。image_prompt保持英文。"
+- image_promptは英語で記述（タイトルの英訳を含める）""",
+}
 
-        system_prompt = f"""你是一个专业的PPT内容策划师和文生图提示词专家。
+_SYSTEM_PROMPT_TMPL = """你是一个专业的PPT内容策划师和文生图提示词专家。
 你的任务是将用户提供的文字内容转化为适合制作PPT的结构化数据。
 
-{lang_instruction}
+{lang}
 
 对于每一页PPT，你需要生成：
 1. title: 简洁有力的标题（10字以内，使用指定语言）
@@ -95,47 +82,201 @@ class LLMClient:
 4. 确保内容逻辑连贯，层次分明
 5. 每个 image_prompt 末尾都要加上 "no text no letters no words" 以确保不生成文字"""
 
-        user_prompt = f"""请根据以下内容，生成一个包含 {num_slides} 页的PPT结构：
+_USER_PROMPT_TMPL = """请根据以下内容，生成一个包含 {num_slides} 页的PPT结构：
 
 {user_input}
 
 请直接输出JSON数组，不要包含markdown代码块标记。"""
 
+
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=HTTP_POOL_SIZE,
+    max_keepalive_connections=HTTP_POOL_SIZE
+)
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    """Return the process-wide Ark chat client, creating it on first use."""
+    return OpenAI(
+        api_key=ARK_API_KEY,
+        base_url=ARK_BASE_URL,
+        http_client=httpx.Client(http2=HTTP2_ENABLED, limits=_HTTP_LIMITS)
+    )
+
+
+def new_async_client() -> AsyncOpenAI:
+    """
+    Create an async Ark chat client with the same settings as get_client().
+    
+    Not shared: an httpx.AsyncClient is bound to the event loop that first
+    uses it, and each asyncio.run() call brings a new loop.
+    """
+    return AsyncOpenAI(
+        api_key=ARK_API_KEY,
+        base_url=ARK_BASE_URL,
+        http_client=httpx.AsyncClient(http2=HTTP2_ENABLED, limits=_HTTP_LIMITS)
+    )
+
+
+def _slide_role(index: int, total: int) -> str:
+    """Role of the slide at index in a deck of total slides."""
+    if index == 0:
+        return "cover"
+    if index == total - 1:
+        return "closing"
+    return "content"
+
+
+def _tag_roles(slides: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Tag each slide with its cover/content/closing role, in place."""
+    for i, slide in enumerate(slides):
+        slide.setdefault('role', _slide_role(i, len(slides)))
+    return slides
+
+
+class LLMClient:
+    """Client for interacting with Seed 2.0 language model via OpenAI-compatible API."""
+    
+    def __init__(self):
+        self.client = get_client()
+        self.endpoint = LLM_ENDPOINT
+
+    def _build_messages(self, user_input: str, num_slides: int, language: str) -> List[Dict[str, str]]:
+        """Build the chat messages asking the model for a PPT structure."""
+        lang_instruction = _LANG_INSTRUCTIONS.get(language)
+        if lang_instruction is None:
+            lang_instruction = f"请使用{language}生成标题和内容。image_prompt保持英文。"
+        
+        system_prompt = _SYSTEM_PROMPT_TMPL.format(lang=lang_instruction)
+        user_prompt = _USER_PROMPT_TMPL.format(num_slides=num_slides, user_input=user_input)
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _cache_key(self, messages: List[Dict[str, str]]) -> str:
+        """Cache key covering the model, the rendered prompts and the sampling params."""
+        return cache.cache_key("llm", self.endpoint, messages, {"temperature": _TEMPERATURE})
+
+    def generate_ppt_structure(self, user_input: str, num_slides: int = 5, language: str = "中文") -> List[Dict[str, Any]]:
+        """
+        Generate PPT structure from user input text.
+        
+        Args:
+            user_input: The user's text input describing the PPT topic
+            num_slides: Number of slides to generate (default: 5)
+            language: Output language for titles and content (default: "中文")
+            
+        Returns:
+            List of slide dictionaries with title, content, image_prompt and role
+        """
+        messages = self._build_messages(user_input, num_slides, language)
+        key = self._cache_key(messages)
+        cached_slides = cache.get_json(key)
+        if cached_slides is not None:
+            logger.info("[LLM] Loaded structure from cache")
+            return _tag_roles(cached_slides)
+        
         completion = self.client.chat.completions.create(
             model=self.endpoint,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7
+            messages=messages,
+            temperature=_TEMPERATURE
         )
         
         # Log request ID for debugging (completion.id contains the request ID)
         request_id = completion.id
-        print(f"[LLM] Request ID: {request_id}", flush=True)
-        print(f"[LLM] Model: {completion.model}", flush=True)
+        logger.info("[LLM] Request ID: %s", request_id)
+        logger.info("[LLM] Model: %s", completion.model)
         
         response_text = completion.choices[0].message.content.strip()
         
         # Parse JSON response
         # Remove markdown code block if present
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            # Remove first and last lines (```json and ```)
-            response_text = "\n".join(lines[1:-1] if lines[-1] == "```" else lines[1:])
+        match = _FENCE_RE.match(response_text)
+        if match:
+            response_text = match.group(1)
         
         try:
-            slides = json.loads(response_text)
+            slides = _tag_roles(orjson.loads(response_text))
+            cache.put_json(key, slides)
             return slides
-        except json.JSONDecodeError as e:
-            print(f"Warning: Failed to parse JSON response: {e}")
-            print(f"Raw response: {response_text}")
+        except orjson.JSONDecodeError as e:
+            logger.warning("Failed to parse JSON response: %s", e)
+            logger.warning("Raw response: %s", response_text)
             # Return a default structure if parsing fails
             return self._create_default_structure(user_input, num_slides)
     
+    async def stream_ppt_structure(
+        self,
+        user_input: str,
+        num_slides: int = 5,
+        language: str = "中文"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the PPT structure, yielding each slide as soon as it is complete.
+        
+        Lets callers start work on early slides (e.g. image generation)
+        while the model is still writing the later ones.
+        
+        Args:
+            user_input: The user's text input describing the PPT topic
+            num_slides: Number of slides to generate (default: 5)
+            language: Output language for titles and content (default: "中文")
+            
+        Yields:
+            Slide dictionaries with title, content, image_prompt and role
+        """
+        messages = self._build_messages(user_input, num_slides, language)
+        key = self._cache_key(messages)
+        cached_slides = cache.get_json(key)
+        if cached_slides is not None:
+            logger.info("[LLM] Loaded structure from cache")
+            for slide in _tag_roles(cached_slides):
+                yield slide
+            return
+        
+        parser = _SlideStreamParser()
+        slides = []
+        chunks = []
+        request_logged = False
+        
+        async with new_async_client() as client:
+            stream = await client.chat.completions.create(
+                model=self.endpoint,
+                messages=messages,
+                temperature=_TEMPERATURE,
+                stream=True
+            )
+            
+            async for chunk in stream:
+                if not request_logged:
+                    logger.info("[LLM] Request ID: %s", chunk.id)
+                    logger.info("[LLM] Model: %s", chunk.model)
+                    request_logged = True
+                
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                
+                text = chunk.choices[0].delta.content
+                chunks.append(text)
+                for slide in parser.feed(text):
+                    slide.setdefault('role', _slide_role(len(slides), num_slides))
+                    slides.append(dict(slide))
+                    yield slide
+        
+        if slides:
+            cache.put_json(key, slides)
+        else:
+            logger.warning("Failed to parse any slides from streamed response")
+            logger.warning("Raw response: %s", ''.join(chunks))
+            for slide in self._create_default_structure(user_input, num_slides):
+                yield slide
+    
     def _create_default_structure(self, topic: str, num_slides: int) -> List[Dict[str, Any]]:
         """Create a default PPT structure if LLM parsing fails."""
-        return [
+        return _tag_roles([
             {
                 "slide_number": i + 1,
                 "title": f"Slide {i + 1}",
@@ -143,7 +284,52 @@ class LLMClient:
                 "image_prompt": f"Professional PPT slide with title 'Slide {i + 1}' in large white font centered, modern blue gradient background, clean corporate design, business presentation style, high quality, 4K"
             }
             for i in range(num_slides)
-        ]
+        ])
+
+
+class _SlideStreamParser:
+    """Incrementally extract the top-level objects of a streamed JSON array."""
+    
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return any slide objects it completed."""
+        slides = []
+        
+        for ch in text:
+            if self._depth == 0:
+                # Skip array brackets, commas and code fences between objects
+                if ch == '{':
+                    self._depth = 1
+                    self._buffer = [ch]
+                continue
+            
+            self._buffer.append(ch)
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        slides.append(orjson.loads("".join(self._buffer)))
+                    except orjson.JSONDecodeError as e:
+                        logger.warning("Skipping malformed slide object: %s", e)
+        
+        return slides
 
 
 def test_llm_client():
@@ -172,4 +358,5 @@ def test_llm_client():
 
 
 if __name__ == "__main__":
+    setup_logging()
     test_llm_client()
@@ -15,18 +15,94 @@ Usage:
 import os
 import sys
 import argparse
+import asyncio
+import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, Dict, Any, Tuple
 
+import cache
 from llm_client import LLMClient
 from image_generator import ImageGenerator
 from ppt_generator import PPTGenerator
-from config import OUTPUT_DIR
+from config import setup_logging
 
-# Force stdout to be unbuffered
-import functools
-print = functools.partial(print, flush=True)
+logger = logging.getLogger("text2ppt")
+
+
+async def _run(
+    llm_client: LLMClient,
+    image_generator: ImageGenerator,
+    ppt_generator: PPTGenerator,
+    text_input: str,
+    num_slides: int,
+    output_name: str,
+    verbose: bool
+) -> Tuple[List[Dict[str, Any]], List[str], str, float]:
+    """
+    Run the whole pipeline with its three steps overlapped.
+    
+    Slides are streamed from the LLM, each slide's image generation starts
+    as soon as it is parsed, and slides are added to the presentation in
+    order as their images complete.
+    
+    Returns:
+        Tuple of (slides data, image paths, PPTX path, LLM time in seconds)
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    slides_data = []
+    image_paths = []
+    llm_time = 0.0
+    
+    async def produce(session):
+        nonlocal llm_time
+        start_time = time.time()
+        try:
+            async for slide in llm_client.stream_ppt_structure(text_input, num_slides):
+                if verbose:
+                    logger.info("  - Slide %s: %s", slide.get('slide_number', '?'), slide.get('title', 'N/A'))
+                index = len(slides_data)
+                slides_data.append(slide)
+                task = asyncio.create_task(
+                    image_generator.generate_slide_image_async(session, slide, output_name, index)
+                )
+                await queue.put((index, slide, task))
+        finally:
+            llm_time = time.time() - start_time
+            await queue.put(None)
+    
+    async def add_slide(pool, item, is_last):
+        index, slide, task = item
+        try:
+            image_path = await task
+        except Exception as e:
+            logger.warning("Image generation raised: %s", e)
+            return
+        if image_path:
+            image_paths.append(image_path)
+            # python-pptx is blocking, so build slides on the single worker thread
+            await loop.run_in_executor(pool, ppt_generator.add_slide, prs, image_path, slide, index, is_last)
+    
+    async def consume(pool):
+        # Hold back one slide so the final one can be laid out as the ending page
+        pending = None
+        while True:
+            item = await queue.get()
+            if pending is not None:
+                await add_slide(pool, pending, is_last=item is None)
+            if item is None:
+                break
+            pending = item
+    
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        prs = await loop.run_in_executor(pool, ppt_generator.new_presentation)
+        async with image_generator.new_session() as session:
+            await asyncio.gather(produce(session), consume(pool))
+        ppt_path = await loop.run_in_executor(pool, ppt_generator.save, prs, output_name)
+    
+    return slides_data, image_paths, ppt_path, llm_time
 
 
 def create_ppt_from_text(
@@ -53,57 +129,39 @@ def create_ppt_from_text(
         output_name = f"presentation_{timestamp}"
     
     if verbose:
-        print("=" * 60)
-        print("Text2PPT - Converting Text to PowerPoint")
-        print("=" * 60)
-        print(f"\nInput text ({len(text_input)} chars):")
-        print(text_input[:200] + "..." if len(text_input) > 200 else text_input)
-        print(f"\nTarget slides: {num_slides}")
-        print("=" * 60)
-    
-    # Step 1: Generate PPT structure using LLM
-    if verbose:
-        print("\n[Step 1/3] Generating PPT structure with Seed 2.0...")
-        
-    start_time = time.time()
-    llm_client = LLMClient()
-    slides_data = llm_client.generate_ppt_structure(text_input, num_slides)
-    llm_time = time.time() - start_time
-    
-    if verbose:
-        print(f"Generated {len(slides_data)} slides in {llm_time:.1f}s")
-        for slide in slides_data:
-            print(f"  - Slide {slide.get('slide_number', '?')}: {slide.get('title', 'N/A')}")
+        logger.info("=" * 60)
+        logger.info("Text2PPT - Converting Text to PowerPoint")
+        logger.info("=" * 60)
+        logger.info("\nInput text (%s chars):", len(text_input))
+        logger.info(text_input[:200] + "..." if len(text_input) > 200 else text_input)
+        logger.info("\nTarget slides: %s", num_slides)
+        logger.info("=" * 60)
     
-    # Step 2: Generate images for each slide
+    # Stream the PPT structure from the LLM, start generating each slide's
+    # image as soon as it is parsed, and add slides as their images arrive
     if verbose:
-        print("\n[Step 2/3] Generating images with Seadream 4.5...")
-        print("(This may take a few minutes...)")
+        logger.info("\n[Step 1/3] Generating PPT structure with Seed 2.0...")
+        logger.info("[Step 2/3] Generating images with Seadream 4.5 as slides arrive...")
+        logger.info("[Step 3/3] Adding slides to the presentation as images complete...")
+        logger.info("(This may take a few minutes...)")
         
     start_time = time.time()
+    llm_client = LLMClient()
     image_generator = ImageGenerator()
-    image_paths = image_generator.generate_slides_images(slides_data, output_name)
-    image_time = time.time() - start_time
-    
-    if verbose:
-        print(f"Generated {len(image_paths)} images in {image_time:.1f}s")
-    
-    # Step 3: Create PPT from images
-    if verbose:
-        print("\n[Step 3/3] Creating PowerPoint presentation...")
-        
-    start_time = time.time()
     ppt_generator = PPTGenerator()
-    ppt_path = ppt_generator.create_ppt_from_images(image_paths, output_name, slides_data)
-    ppt_time = time.time() - start_time
+    slides_data, image_paths, ppt_path, llm_time = asyncio.run(
+        _run(llm_client, image_generator, ppt_generator, text_input, num_slides, output_name, verbose)
+    )
+    total_time = time.time() - start_time
     
     if verbose:
-        print(f"Created presentation in {ppt_time:.1f}s")
-        print("\n" + "=" * 60)
-        print("COMPLETED!")
-        print(f"Output file: {ppt_path}")
-        print(f"Total time: {llm_time + image_time + ppt_time:.1f}s")
-        print("=" * 60)
+        logger.info("Generated %s slides in %.1fs", len(slides_data), llm_time)
+        logger.info("Generated %s images and created presentation in %.1fs", len(image_paths), total_time)
+        logger.info("\n" + "=" * 60)
+        logger.info("COMPLETED!")
+        logger.info("Output file: %s", ppt_path)
+        logger.info("Total time: %.1fs", total_time)
+        logger.info("=" * 60)
     
     return ppt_path
 
@@ -159,6 +217,8 @@ def interactive_mode():
 
 def main():
     """Main entry point."""
+    setup_logging()
+    
     parser = argparse.ArgumentParser(
         description="Convert text to PowerPoint presentation using AI"
     )
@@ -189,14 +249,22 @@ def main():
         action="store_true",
         help="Reduce output verbosity"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the APIs instead of reusing cached results"
+    )
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        cache.set_enabled(False)
+    
     # Determine input source
     if args.input:
         # Read from file
         if not os.path.exists(args.input):
-            print(f"Error: Input file not found: {args.input}")
+            logger.error("Input file not found: %s", args.input)
             sys.exit(1)
         with open(args.input, 'r', encoding='utf-8') as f:
             text_input = f.read()
@@ -2,28 +2,230 @@
 PPT Generator Module - Creates PowerPoint presentations with text overlays.
 Uses background images with programmatically added text for clear, editable content.
 """
+import io
 import os
+import re
+import logging
+import weakref
+import zipfile
 from typing import List, Dict, Any, Optional
+from xml.sax.saxutils import escape
+from PIL import Image
 from pptx import Presentation
+from pptx.api import _default_pptx_path
 from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.enum.shapes import MSO_SHAPE
-from config import SLIDE_WIDTH, SLIDE_HEIGHT, OUTPUT_DIR
+from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.serialized import PackageWriter, _ZipPkgWriter
+from config import SLIDE_WIDTH, SLIDE_HEIGHT, OUTPUT_DIR, ensure_dirs, setup_logging
+
+logger = logging.getLogger("text2ppt")
+
+# Content points are separated by ASCII or full-width semicolons
+_SEMI_RE = re.compile(r'[;；]')
+
+# Backgrounds are embedded at the slide's rendered size rather than the
+# generated resolution, which keeps the PPTX small and quick to save
+_BG_MAX_SIZE = (1920, 1080)
+_BG_JPEG_QUALITY = 85
+
+# Presentation() re-reads the bundled default template from disk each time;
+# keep its bytes so new decks only need to parse it
+with open(_default_pptx_path(), 'rb') as _f:
+    _TEMPLATE_BYTES = _f.read()
+
+# Media parts are already compressed, so deflating them again only costs time
+_STORED_EXTS = frozenset(('jpg', 'jpeg', 'png', 'gif'))
+
+
+# Colors, font sizes and overlay geometry are fixed, so build them once
+_WHITE, _BLACK, _GRAY = RGBColor(255, 255, 255), RGBColor(0, 0, 0), RGBColor(200, 200, 200)
+_PT28, _PT40, _PT54, _PT60, _PT24, _PT12, _PT8 = map(Pt, (28, 40, 54, 60, 24, 12, 8))
+
+_MARGIN = Inches(0.5)
+_TEXT_WIDTH = Inches(SLIDE_WIDTH - 1)
+_TITLE_HEIGHT = Inches(1.5)
+
+_COVER_OVERLAY_TOP, _COVER_OVERLAY_HEIGHT = Inches(2.5), Inches(3)
+_COVER_TITLE_TOP = Inches(2.8)
+_COVER_SUBTITLE_TOP, _COVER_SUBTITLE_HEIGHT = Inches(4.2), Inches(0.8)
+
+_TITLE_BAR_HEIGHT = Inches(1.4)
+_CONTENT_TITLE_LEFT, _CONTENT_TITLE_TOP = Inches(0.6), Inches(0.35)
+_CONTENT_TITLE_WIDTH, _CONTENT_TITLE_HEIGHT = Inches(SLIDE_WIDTH - 1.2), Inches(0.9)
+_CONTENT_BG_TOP, _CONTENT_BG_HEIGHT = Inches(1.8), Inches(4.8)
+_CONTENT_TEXT_LEFT, _CONTENT_TEXT_TOP = Inches(0.8), Inches(2.0)
+_CONTENT_TEXT_WIDTH, _CONTENT_TEXT_HEIGHT = Inches(SLIDE_WIDTH - 1.6), Inches(4.4)
+
+_ENDING_OVERLAY_TOP, _ENDING_OVERLAY_HEIGHT = Inches(2.8), Inches(2.5)
+_ENDING_TITLE_TOP = Inches(3.2)
+
+
+# Overlay shapes are rendered from OOXML templates and parsed once each,
+# instead of being built up through python-pptx's shape/paragraph proxies.
+# The markup matches what add_shape()/add_textbox() would produce.
+_NSDECLS = nsdecls('a', 'p')
+
+_OVERLAY_XML = (
+    '<p:sp ' + _NSDECLS + '>'
+    '<p:nvSpPr><p:cNvPr id="{id}" name="Overlay {id}"/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr>'
+    '<a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="{prst}"><a:avLst/></a:prstGeom>'
+    '<a:solidFill><a:srgbClr val="{color}"><a:lumMod val="{lum_mod}"/><a:lumOff val="{lum_off}"/></a:srgbClr></a:solidFill>'
+    '<a:ln><a:noFill/></a:ln>'
+    '</p:spPr>'
+    '<p:style>'
+    '<a:lnRef idx="1"><a:schemeClr val="accent1"/></a:lnRef>'
+    '<a:fillRef idx="3"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="2"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="lt1"/></a:fontRef>'
+    '</p:style>'
+    '<p:txBody><a:bodyPr rtlCol="0" anchor="ctr"/><a:lstStyle/><a:p><a:pPr algn="ctr"/></a:p></p:txBody>'
+    '</p:sp>'
+)
+
+_TEXTBOX_XML = (
+    '<p:sp ' + _NSDECLS + '>'
+    '<p:nvSpPr><p:cNvPr id="{id}" name="TextBox {id}"/><p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr>'
+    '<a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/>'
+    '</p:spPr>'
+    '<p:txBody><a:bodyPr wrap="{wrap}"><a:spAutoFit/></a:bodyPr><a:lstStyle/>{paragraphs}</p:txBody>'
+    '</p:sp>'
+)
+
+_PARAGRAPH_XML = '<a:p><a:pPr{align}>{spacing}</a:pPr>{runs}</a:p>'
+
+_RPR_XML = '<a:rPr sz="{size}"{bold}><a:solidFill><a:srgbClr val="{color}"/></a:solidFill></a:rPr>'
+
+# Text is split into runs at line breaks, as python-pptx's paragraph.text
+# setter does, and characters XML 1.0 cannot hold are written as the
+# _xHHHH_ escapes python-pptx uses for control characters
+_LINE_BREAK_RE = re.compile(r'\r\n|[\r\n\v]')
+_INVALID_XML_CHAR_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\uD800-\uDFFF\uFFFE\uFFFF]')
+
+
+def _centipoints(length) -> int:
+    """Convert a length to the hundredths of a point used by OOXML font sizes."""
+    return round(length.pt * 100)
+
+
+# Bullet paragraphs only differ by their runs
+_BULLET_XML = _PARAGRAPH_XML.format(
+    align='',
+    spacing=(
+        f'<a:spcBef><a:spcPts val="{_centipoints(_PT12)}"/></a:spcBef>'
+        f'<a:spcAft><a:spcPts val="{_centipoints(_PT8)}"/></a:spcAft>'
+    ),
+    runs='{runs}'
+)
+_BULLET_RPR = _RPR_XML.format(size=_centipoints(_PT28), bold='', color=_WHITE)
 
 
 def rgb_color(r, g, b):
     """Create RGB color from r, g, b values (0-255)."""
-    from pptx.dml.color import RGBColor
     return RGBColor(r, g, b)
 
 
+def _overlay_xml(shape_id: int, prst: str, x, y, cx, cy, brightness: float) -> str:
+    """Render a borderless black overlay lightened by the given brightness."""
+    lum_off = round(brightness * 100000)
+    return _OVERLAY_XML.format(
+        id=shape_id, prst=prst, x=x, y=y, cx=cx, cy=cy,
+        color=_BLACK, lum_mod=100000 - lum_off, lum_off=lum_off
+    )
+
+
+def _escape_char(match) -> str:
+    """Replace a character XML cannot hold with its _xHHHH_ escape."""
+    return '_x%04X_' % ord(match.group())
+
+
+def _runs_xml(text: str, rpr: str) -> str:
+    """Render text as runs with the given properties, joined by line breaks."""
+    parts = []
+    for idx, line in enumerate(_LINE_BREAK_RE.split(text)):
+        # Breaks only go between lines, and empty runs are left out
+        if idx:
+            parts.append(f'<a:br>{rpr}</a:br>')
+        if line:
+            line = escape(_INVALID_XML_CHAR_RE.sub(_escape_char, line))
+            parts.append(f'<a:r>{rpr}<a:t>{line}</a:t></a:r>')
+    return ''.join(parts)
+
+
+def _paragraph_xml(text: str, size, color=_WHITE, bold: bool = False, center: bool = False) -> str:
+    """Render a paragraph of text with the given font settings."""
+    rpr = _RPR_XML.format(size=_centipoints(size), bold=' b="1"' if bold else '', color=color)
+    return _PARAGRAPH_XML.format(
+        align=' algn="ctr"' if center else '',
+        spacing='',
+        runs=_runs_xml(text, rpr)
+    )
+
+
+def _bullet_xml(point: str) -> str:
+    """Render one content bullet paragraph."""
+    return _BULLET_XML.format(runs=_runs_xml(f"• {point}", _BULLET_RPR))
+
+
+def _prepare_bg(path: str) -> bytes:
+    """Downscale a background image to slide size and re-encode it as JPEG."""
+    with Image.open(path) as img:
+        img = img.convert('RGB')
+        img.thumbnail(_BG_MAX_SIZE, Image.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=_BG_JPEG_QUALITY)
+    return buf.getvalue()
+
+
+def _append_shape(slide, xml: str):
+    """Parse a rendered shape and add it on top of the slide's shape tree."""
+    slide.shapes._spTree.insert_element_before(parse_xml(xml), 'p:extLst')
+
+
+class _ZipPartWriter(_ZipPkgWriter):
+    """
+    Zip writer that stores images as-is and deflates XML at level 1.
+    
+    python-pptx's writer deflates every part at the default level 6 and
+    spends most of the save time recompressing JPEG/PNG data.
+    """
+    
+    def write(self, pack_uri, blob: bytes):
+        if pack_uri.ext.lower() in _STORED_EXTS:
+            self._zipf.writestr(pack_uri.membername, blob, compress_type=zipfile.ZIP_STORED)
+        else:
+            self._zipf.writestr(
+                pack_uri.membername, blob, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1
+            )
+
+
+class _PackageWriter(PackageWriter):
+    """PackageWriter that writes through _ZipPartWriter, for PPTGenerator.save only."""
+    
+    def _write(self):
+        with _ZipPartWriter(self._pkg_file) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+
+
 class PPTGenerator:
     """Generates PowerPoint presentations with background images and text overlays."""
     
     def __init__(self):
         self.width = Inches(SLIDE_WIDTH)
         self.height = Inches(SLIDE_HEIGHT)
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        # Background image parts per presentation, keyed by image path
+        self._image_part_cache = weakref.WeakKeyDictionary()
+        # Blank slide layout per presentation
+        self._blank_layouts = weakref.WeakKeyDictionary()
+        ensure_dirs()
     
     def create_ppt_from_images(
         self, 
@@ -42,203 +244,200 @@ class PPTGenerator:
         Returns:
             Path to the created PPT file
         """
-        prs = Presentation()
-        prs.slide_width = self.width
-        prs.slide_height = self.height
-        
-        blank_layout = prs.slide_layouts[6]  # Blank layout
+        prs = self.new_presentation()
         
         for i, image_path in enumerate(image_paths):
-            if not os.path.exists(image_path):
-                print(f"Warning: Image not found: {image_path}")
-                continue
-            
-            # Create slide
-            slide = prs.slides.add_slide(blank_layout)
-            
-            # Add background image (fill entire slide)
-            slide.shapes.add_picture(
-                image_path,
-                left=0,
-                top=0,
-                width=self.width,
-                height=self.height
-            )
-            
             # Get slide data
             slide_info = slides_data[i] if slides_data and i < len(slides_data) else {}
-            title = slide_info.get('title', '')
-            content = slide_info.get('content', '')
             slide_num = slide_info.get('slide_number', i + 1)
+            is_last = bool(slides_data) and slide_num == len(slides_data)
             
-            # Add text overlays
-            if slide_num == 1:
-                # Cover slide - centered title
-                self._add_cover_text(slide, title, content)
-            elif slides_data and slide_num == len(slides_data):
-                # Last slide - thank you page
-                self._add_ending_text(slide, title)
-            else:
-                # Content slides
-                self._add_content_text(slide, title, content)
+            # Paths come straight from the image generator, so skip the
+            # per-slide stat and only handle the rare file that has vanished
+            try:
+                self.add_slide(prs, image_path, slide_info, i, is_last)
+            except FileNotFoundError:
+                logger.warning("Image not found: %s", image_path)
+        
+        return self.save(prs, output_filename)
+    
+    def new_presentation(self) -> Presentation:
+        """Create an empty presentation sized for the slide backgrounds."""
+        prs = Presentation(io.BytesIO(_TEMPLATE_BYTES))
+        prs.slide_width = self.width
+        prs.slide_height = self.height
+        return prs
+    
+    def add_slide(
+        self,
+        prs: Presentation,
+        image_path: str,
+        slide_info: Optional[Dict[str, Any]] = None,
+        index: int = 0,
+        is_last: bool = False
+    ):
+        """
+        Append one slide with a background image and text overlay.
+        
+        Lets callers build a presentation incrementally as images arrive.
+        Slides must be added in order, from a single thread at a time.
+        
+        Raises FileNotFoundError, before adding anything, if the image is missing.
+        
+        Args:
+            prs: Presentation to add the slide to
+            image_path: Path to the background image
+            slide_info: Slide data with title and content
+            index: Zero-based position of the slide in the deck
+            is_last: Whether this is the final (thank you) slide
+            
+        Returns:
+            The created slide
+        """
+        slide_info = slide_info or {}
+        
+        # Load the image first so a missing file doesn't leave a blank slide
+        image_part = self._get_or_add_image_part(prs, image_path)
+        
+        # Create slide
+        slide = prs.slides.add_slide(self._blank_layout(prs))
+        
+        # Add background image (fill entire slide)
+        rId = slide.part.relate_to(image_part, RT.IMAGE)
+        slide.shapes._add_pic_from_image_part(image_part, rId, 0, 0, self.width, self.height)
+        
+        title = slide_info.get('title', '')
+        content = slide_info.get('content', '')
+        slide_num = slide_info.get('slide_number', index + 1)
+        
+        # Add text overlays
+        if slide_num == 1:
+            # Cover slide - centered title
+            self._add_cover_text(slide, title, content)
+        elif is_last:
+            # Last slide - thank you page
+            self._add_ending_text(slide, title)
+        else:
+            # Content slides
+            self._add_content_text(slide, title, content)
+        
+        return slide
+    
+    def _blank_layout(self, prs: Presentation):
+        """Return the blank layout of prs, looking it up only once per presentation."""
+        layout = self._blank_layouts.get(prs.part)
+        if layout is None:
+            layout = self._blank_layouts[prs.part] = prs.slide_layouts[6]  # Blank layout
+        return layout
+    
+    def _get_or_add_image_part(self, prs: Presentation, image_path: str):
+        """
+        Return the image part for image_path in prs, adding it on first use.
+        
+        add_picture() re-reads and re-hashes the file for every slide; caching
+        the part means each background is loaded once per presentation and
+        slides that share an image reference the same part. The embedded
+        image is the downscaled JPEG from _prepare_bg().
+        """
+        # Presentation proxies are unhashable, so key by the presentation part
+        parts = self._image_part_cache.setdefault(prs.part, {})
+        image_part = parts.get(image_path)
+        if image_part is None:
+            image_bytes = _prepare_bg(image_path)
+            image_part = prs.part.package.get_or_add_image_part(io.BytesIO(image_bytes))
+            parts[image_path] = image_part
+        return image_part
+    
+    def save(self, prs: Presentation, output_filename: str) -> str:
+        """
+        Save the presentation to the output directory.
         
-        # Save the presentation
+        Returns:
+            Path to the saved PPT file
+        """
         output_path = os.path.join(OUTPUT_DIR, f"{output_filename}.pptx")
-        prs.save(output_path)
-        print(f"PPT saved to: {output_path}")
+        # Same as prs.save(), but with the faster part compression above
+        package = prs.part.package
+        _PackageWriter.write(output_path, package._rels, tuple(package.iter_parts()))
+        logger.info("PPT saved to: %s", output_path)
         
         return output_path
     
     def _add_cover_text(self, slide, title: str, subtitle: str = ""):
         """Add centered title and subtitle for cover slide."""
+        shape_id = slide.shapes._next_shape_id
+        
         # Semi-transparent overlay for better text readability
-        overlay = slide.shapes.add_shape(
-            MSO_SHAPE.RECTANGLE,
-            left=0,
-            top=Inches(2.5),
-            width=self.width,
-            height=Inches(3)
-        )
-        overlay.fill.solid()
-        overlay.fill.fore_color.rgb = rgb_color(0, 0, 0)
-        # Set transparency
-        overlay.fill.fore_color.brightness = 0.3
-        overlay.line.fill.background()
+        _append_shape(slide, _overlay_xml(
+            shape_id, 'rect', 0, _COVER_OVERLAY_TOP, self.width, _COVER_OVERLAY_HEIGHT, 0.3
+        ))
         
         # Title
-        title_box = slide.shapes.add_textbox(
-            left=Inches(0.5),
-            top=Inches(2.8),
-            width=Inches(SLIDE_WIDTH - 1),
-            height=Inches(1.5)
-        )
-        title_frame = title_box.text_frame
-        title_frame.word_wrap = True
-        title_para = title_frame.paragraphs[0]
-        title_para.text = title
-        title_para.font.size = Pt(54)
-        title_para.font.bold = True
-        title_para.font.color.rgb = rgb_color(255, 255, 255)
-        title_para.alignment = PP_ALIGN.CENTER
+        _append_shape(slide, _TEXTBOX_XML.format(
+            id=shape_id + 1, x=_MARGIN, y=_COVER_TITLE_TOP, cx=_TEXT_WIDTH, cy=_TITLE_HEIGHT,
+            wrap='square', paragraphs=_paragraph_xml(title, _PT54, bold=True, center=True)
+        ))
         
         # Subtitle
         if subtitle:
-            sub_box = slide.shapes.add_textbox(
-                left=Inches(0.5),
-                top=Inches(4.2),
-                width=Inches(SLIDE_WIDTH - 1),
-                height=Inches(0.8)
-            )
-            sub_frame = sub_box.text_frame
-            sub_para = sub_frame.paragraphs[0]
-            sub_para.text = subtitle.replace('；', ' · ').replace(';', ' · ')
-            sub_para.font.size = Pt(24)
-            sub_para.font.color.rgb = rgb_color(200, 200, 200)
-            sub_para.alignment = PP_ALIGN.CENTER
+            subtitle = _SEMI_RE.sub(' · ', subtitle)
+            _append_shape(slide, _TEXTBOX_XML.format(
+                id=shape_id + 2, x=_MARGIN, y=_COVER_SUBTITLE_TOP, cx=_TEXT_WIDTH, cy=_COVER_SUBTITLE_HEIGHT,
+                wrap='none', paragraphs=_paragraph_xml(subtitle, _PT24, color=_GRAY, center=True)
+            ))
     
     def _add_content_text(self, slide, title: str, content: str):
         """Add title and bullet points for content slides."""
+        shape_id = slide.shapes._next_shape_id
+        
         # Title background bar
-        title_bg = slide.shapes.add_shape(
-            MSO_SHAPE.RECTANGLE,
-            left=0,
-            top=0,
-            width=self.width,
-            height=Inches(1.4)
-        )
-        title_bg.fill.solid()
-        title_bg.fill.fore_color.rgb = rgb_color(0, 0, 0)
-        title_bg.fill.fore_color.brightness = 0.2
-        title_bg.line.fill.background()
+        _append_shape(slide, _overlay_xml(
+            shape_id, 'rect', 0, 0, self.width, _TITLE_BAR_HEIGHT, 0.2
+        ))
         
         # Title
-        title_box = slide.shapes.add_textbox(
-            left=Inches(0.6),
-            top=Inches(0.35),
-            width=Inches(SLIDE_WIDTH - 1.2),
-            height=Inches(0.9)
-        )
-        title_frame = title_box.text_frame
-        title_para = title_frame.paragraphs[0]
-        title_para.text = title
-        title_para.font.size = Pt(40)
-        title_para.font.bold = True
-        title_para.font.color.rgb = rgb_color(255, 255, 255)
+        _append_shape(slide, _TEXTBOX_XML.format(
+            id=shape_id + 1, x=_CONTENT_TITLE_LEFT, y=_CONTENT_TITLE_TOP,
+            cx=_CONTENT_TITLE_WIDTH, cy=_CONTENT_TITLE_HEIGHT,
+            wrap='none', paragraphs=_paragraph_xml(title, _PT40, bold=True)
+        ))
         
         # Content area with semi-transparent background
         if content:
-            content_bg = slide.shapes.add_shape(
-                MSO_SHAPE.ROUNDED_RECTANGLE,
-                left=Inches(0.5),
-                top=Inches(1.8),
-                width=Inches(SLIDE_WIDTH - 1),
-                height=Inches(4.8)
-            )
-            content_bg.fill.solid()
-            content_bg.fill.fore_color.rgb = rgb_color(0, 0, 0)
-            content_bg.fill.fore_color.brightness = 0.4
-            content_bg.line.fill.background()
-            
-            # Content text
-            content_box = slide.shapes.add_textbox(
-                left=Inches(0.8),
-                top=Inches(2.0),
-                width=Inches(SLIDE_WIDTH - 1.6),
-                height=Inches(4.4)
-            )
-            content_frame = content_box.text_frame
-            content_frame.word_wrap = True
+            _append_shape(slide, _overlay_xml(
+                shape_id + 2, 'roundRect', _MARGIN, _CONTENT_BG_TOP, _TEXT_WIDTH, _CONTENT_BG_HEIGHT, 0.4
+            ))
             
             # Parse content points (split by ; or ；)
-            points = [p.strip() for p in content.replace('；', ';').split(';') if p.strip()]
+            points = [p for p in map(str.strip, _SEMI_RE.split(content)) if p]
+            points_xml = "".join(map(_bullet_xml, points))
             
-            for idx, point in enumerate(points):
-                if idx == 0:
-                    para = content_frame.paragraphs[0]
-                else:
-                    para = content_frame.add_paragraph()
-                
-                para.text = f"• {point}"
-                para.font.size = Pt(28)
-                para.font.color.rgb = rgb_color(255, 255, 255)
-                para.space_before = Pt(12)
-                para.space_after = Pt(8)
+            # Content text
+            _append_shape(slide, _TEXTBOX_XML.format(
+                id=shape_id + 3, x=_CONTENT_TEXT_LEFT, y=_CONTENT_TEXT_TOP,
+                cx=_CONTENT_TEXT_WIDTH, cy=_CONTENT_TEXT_HEIGHT,
+                wrap='square', paragraphs=points_xml or '<a:p/>'
+            ))
     
     def _add_ending_text(self, slide, title: str):
         """Add centered text for ending/thank you slide."""
+        shape_id = slide.shapes._next_shape_id
+        
         # Overlay
-        overlay = slide.shapes.add_shape(
-            MSO_SHAPE.RECTANGLE,
-            left=0,
-            top=Inches(2.8),
-            width=self.width,
-            height=Inches(2.5)
-        )
-        overlay.fill.solid()
-        overlay.fill.fore_color.rgb = rgb_color(0, 0, 0)
-        overlay.fill.fore_color.brightness = 0.3
-        overlay.line.fill.background()
+        _append_shape(slide, _overlay_xml(
+            shape_id, 'rect', 0, _ENDING_OVERLAY_TOP, self.width, _ENDING_OVERLAY_HEIGHT, 0.3
+        ))
         
         # Title
-        title_box = slide.shapes.add_textbox(
-            left=Inches(0.5),
-            top=Inches(3.2),
-            width=Inches(SLIDE_WIDTH - 1),
-            height=Inches(1.5)
-        )
-        title_frame = title_box.text_frame
-        title_para = title_frame.paragraphs[0]
-        title_para.text = title
-        title_para.font.size = Pt(60)
-        title_para.font.bold = True
-        title_para.font.color.rgb = rgb_color(255, 255, 255)
-        title_para.alignment = PP_ALIGN.CENTER
+        _append_shape(slide, _TEXTBOX_XML.format(
+            id=shape_id + 1, x=_MARGIN, y=_ENDING_TITLE_TOP, cx=_TEXT_WIDTH, cy=_TITLE_HEIGHT,
+            wrap='none', paragraphs=_paragraph_xml(title, _PT60, bold=True, center=True)
+        ))
 
 
 def test_ppt_generator():
     """Test the PPT generator with sample slides."""
     import tempfile
-    from PIL import Image
     
     # Create test background images
     test_images = []
@@ -288,5 +487,25 @@ def test_ppt_generator():
         os.remove(path)
 
 
+def test_text_escaping():
+    """Check that control characters and line breaks in slide text render as valid XML."""
+    from pptx.oxml.ns import qn
+    
+    prs = Presentation(io.BytesIO(_TEMPLATE_BYTES))
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    generator = PPTGenerator()
+    generator._add_cover_text(slide, "Title\x0bwith\x1bcontrol <chars> & more", "Line one\nLine two；Three")
+    generator._add_content_text(slide, "Bell\x07 title", "first\r\nsecond; \x00third")
+    
+    texts = [t.text for t in slide.shapes._spTree.iter(qn('a:t'))]
+    breaks = len(list(slide.shapes._spTree.iter(qn('a:br'))))
+    assert "Title" in texts and "with_x001B_control <chars> & more" in texts, texts
+    assert "Bell_x0007_ title" in texts and "• _x0000_third" in texts, texts
+    assert breaks == 3, breaks
+    print("Text escaping OK")
+
+
 if __name__ == "__main__":
+    setup_logging()
+    test_text_escaping()
     test_ppt_generator()
@@ -158,11 +158,21 @@ async function handleSubmit() {
 // Poll for status
 async function pollStatus() {
     let progress = 10;
+    let etag = null;
+    let data = null;
 
     const poll = async () => {
         try {
-            const response = await fetch(`${API_BASE}/api/status/${currentTaskId}`);
-            const data = await response.json();
+            // Send the last ETag so an unchanged status comes back as an empty 304
+            const headers = etag ? { 'If-None-Match': etag } : {};
+            const response = await fetch(`${API_BASE}/api/status/${currentTaskId}`, {
+                headers,
+                cache: 'no-store'
+            });
+            if (response.status !== 304 || !data) {
+                data = await response.json();
+                etag = response.headers.get('ETag');
+            }
 
             if (data.status === 'processing') {
                 progress = Math.min(progress + 12, 85);
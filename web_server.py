@@ -4,52 +4,178 @@ Flask-based API for the Text2PPT application.
 """
 import os
 import json
-import uuid
+import functools
+import logging
+import secrets
+import hashlib
+import time
+import queue
 import threading
+import concurrent.futures
+from collections import OrderedDict
 from datetime import datetime
+import orjson
 from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 
+import cache
 from llm_client import LLMClient
-from image_generator import ImageGenerator
+from image_generator import ImageGenerator, size_for_slide
 from ppt_generator import PPTGenerator
-from config import OUTPUT_DIR
+from config import OUTPUT_DIR, setup_logging
+
+setup_logging()
+logger = logging.getLogger("text2ppt")
+
+# The on-disk cache has no size limit and would pin one sampled completion
+# for every identical request, so the long-running server leaves it off
+# unless WEB_CACHE is set
+cache.set_enabled(os.getenv('WEB_CACHE', '0').lower() in ('1', 'true'))
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider that serializes with orjson straight to UTF-8 bytes."""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
 
 app = Flask(__name__, static_folder='static')
+app.json = OrjsonProvider(app)
 CORS(app)
 
+
+class TaskStore:
+    """
+    Thread-safe task registry shared by request handlers and worker threads.
+    
+    Finished (completed or failed) tasks expire a fixed time after they
+    finish, and the oldest finished tasks are dropped once the store is
+    full, so memory stays bounded for long-running servers. Pending and
+    processing tasks are never evicted.
+    """
+    
+    FINISHED_STATUSES = ('completed', 'failed')
+    
+    def __init__(self, ttl_seconds: float = 30 * 60, max_size: int = 512):
+        self._ttl = ttl_seconds
+        self._max_size = max_size
+        # task_id -> task, in creation order
+        self._tasks = OrderedDict()
+        # task_id -> finish time, oldest first
+        self._finished = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def get(self, task_id: str):
+        """Return a snapshot of the task, or None if it is unknown."""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+    
+    def set(self, task_id: str, task: dict):
+        """Add a task and evict expired or excess finished entries."""
+        with self._lock:
+            self._tasks[task_id] = task
+            self._tasks.move_to_end(task_id)
+            self._evict()
+    
+    def update(self, task_id: str, **fields):
+        """Update fields of a task; ignored if the task has been evicted."""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return
+            task.update(fields)
+            if task.get('status') in self.FINISHED_STATUSES and task_id not in self._finished:
+                self._finished[task_id] = time.monotonic()
+                self._evict()
+    
+    def values(self):
+        """Return snapshots of all tasks, oldest first."""
+        with self._lock:
+            return [dict(task) for task in self._tasks.values()]
+    
+    def _evict(self):
+        cutoff = time.monotonic() - self._ttl
+        while self._finished:
+            task_id, finished_at = next(iter(self._finished.items()))
+            if finished_at >= cutoff and len(self._tasks) <= self._max_size:
+                break
+            del self._finished[task_id]
+            del self._tasks[task_id]
+
+
 # Store task status
-tasks = {}
+tasks = TaskStore()
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm_client() -> LLMClient:
+    """
+    Return the LLM client shared by all tasks, creating it on first use.
+    
+    Both clients are stateless wrappers around shared, thread-safe HTTP
+    clients, so tasks reuse them and their warm connection pools. They are
+    created lazily so the server still starts without ARK_API_KEY and each
+    task reports the error instead.
+    """
+    return LLMClient()
+
+
+@functools.lru_cache(maxsize=1)
+def get_image_generator() -> ImageGenerator:
+    """Return the image generator shared by all tasks, creating it on first use."""
+    return ImageGenerator()
+
+
+# Bounded pool for generation tasks; extra requests wait in its queue
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv('WORKER_POOL', '4')),
+    thread_name_prefix='ppt-task'
+)
+
+MIN_SLIDES, MAX_SLIDES = 1, 50
+
+PPTX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
 
 
 def generate_ppt_task(task_id: str, text: str, num_slides: int, language: str, style: str):
     """Background task to generate PPT."""
     try:
-        print(f"\n{'='*60}", flush=True)
-        print(f"[Task {task_id}] 开始生成 PPT", flush=True)
-        print(f"[Task {task_id}] 页数: {num_slides}, 语言: {language}, 风格: {style}", flush=True)
-        print(f"{'='*60}", flush=True)
+        logger.info("\n" + "=" * 60)
+        logger.info("[Task %s] 开始生成 PPT", task_id)
+        logger.info("[Task %s] 页数: %s, 语言: %s, 风格: %s", task_id, num_slides, language, style)
+        logger.info("=" * 60)
         
-        tasks[task_id]['status'] = 'processing'
-        tasks[task_id]['progress'] = '正在分析内容结构...'
+        tasks.update(task_id, status='processing', progress='正在分析内容结构...')
         
         # Step 1: Generate structure with language parameter
-        print(f"\n[Step 1] 调用 LLM 生成内容结构...", flush=True)
-        llm = LLMClient()
-        slides = llm.generate_ppt_structure(text, num_slides, language)
-        print(f"[Step 1] 成功生成 {len(slides)} 页结构", flush=True)
-        tasks[task_id]['progress'] = f'已生成 {len(slides)} 页内容结构'
-        tasks[task_id]['slides_count'] = len(slides)
-        
-        # Step 2: Generate images
-        print(f"\n[Step 2] 开始生成图片...", flush=True)
-        tasks[task_id]['progress'] = '正在生成图片...'
-        gen = ImageGenerator()
-        
-        image_paths = []
+        logger.info("\n[Step 1] 调用 LLM 生成内容结构...")
+        slides = get_llm_client().generate_ppt_structure(text, num_slides, language)
+        logger.info("[Step 1] 成功生成 %s 页结构", len(slides))
+        tasks.update(task_id, progress=f'已生成 {len(slides)} 页内容结构', slides_count=len(slides))
+        
+        # Step 2 and 3: Generate images concurrently and add each slide to
+        # the PPT as soon as it and every slide before it are ready
+        logger.info("\n[Step 2] 开始生成图片...")
+        tasks.update(task_id, progress='正在生成图片...')
+        image_generator = get_image_generator()
+        ppt = PPTGenerator()
+        prs = ppt.new_presentation()
+        
+        # (index, image path or None) in completion order
+        ready = queue.Queue()
+        
+        jobs = []
         for i, slide in enumerate(slides):
-            print(f"\n[Step 2] 正在生成第 {i+1}/{len(slides)} 页图片...", flush=True)
-            tasks[task_id]['progress'] = f'正在生成第 {i+1}/{len(slides)} 页图片...'
             slide_num = slide.get('slide_number', i + 1)
             prompt = slide.get('image_prompt', '')
             
@@ -59,37 +185,98 @@ def generate_ppt_task(task_id: str, text: str, num_slides: int, language: str, s
                     prompt = f"{prompt}, {style} design style"
                     
                 output_filename = f"{task_id}_slide_{slide_num:02d}"
-                image_path = gen.generate_image(prompt, output_filename)
+                jobs.append((i, prompt, output_filename, size_for_slide(slide)))
+            else:
+                ready.put((i, None))
+        
+        completed = 0
+        progress_lock = threading.Lock()
+        
+        def render(i, prompt, output_filename, size):
+            nonlocal completed
+            image_path = None
+            try:
+                image_path = image_generator.generate_image(prompt, output_filename, size)
                 if image_path:
-                    image_paths.append(image_path)
-                    slide['image_path'] = image_path
-                    print(f"[Step 2] 第 {i+1} 页图片生成成功", flush=True)
+                    slides[i]['image_path'] = image_path
+                    logger.info("[Step 2] 第 %s 页图片生成成功", i + 1)
+            except Exception as e:
+                logger.warning("[Step 2] 第 %s 页图片生成失败: %s", i + 1, e)
+            finally:
+                ready.put((i, image_path))
+                # Publish under the lock so progress never steps backwards
+                with progress_lock:
+                    completed += 1
+                    tasks.update(task_id, progress=f'已生成 {completed}/{len(jobs)} 页图片...')
         
-        # Step 3: Create PPT
-        print(f"\n[Step 3] 正在创建 PPT 文件...", flush=True)
-        tasks[task_id]['progress'] = '正在创建 PPT 文件...'
-        ppt = PPTGenerator()
+        assemble_errors = []
+        
+        def assemble():
+            # python-pptx is not thread-safe, so only this thread touches prs
+            # until it finishes; slides are added strictly in order
+            pending = {}
+            next_index = 0
+            try:
+                while True:
+                    item = ready.get()
+                    if item is None:
+                        break
+                    pending[item[0]] = item[1]
+                    while next_index in pending:
+                        image_path = pending.pop(next_index)
+                        if image_path:
+                            slide = slides[next_index]
+                            is_last = slide.get('slide_number', next_index + 1) == len(slides)
+                            try:
+                                ppt.add_slide(prs, image_path, slide, next_index, is_last)
+                            except FileNotFoundError:
+                                logger.warning("[Step 3] 图片不存在: %s", image_path)
+                        next_index += 1
+            except Exception as e:
+                assemble_errors.append(e)
+        
+        assembler = threading.Thread(target=assemble, daemon=True)
+        assembler.start()
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(len(jobs), 8))) as executor:
+            for job in jobs:
+                executor.submit(render, *job)
+        
+        ready.put(None)
+        assembler.join()
+        if assemble_errors:
+            raise assemble_errors[0]
+        
+        # Step 3: Save PPT
+        logger.info("\n[Step 3] 正在保存 PPT 文件...")
+        tasks.update(task_id, progress='正在保存 PPT 文件...')
         output_filename = f"presentation_{task_id}"
-        ppt_path = ppt.create_ppt_from_images(image_paths, output_filename, slides)
+        ppt_path = ppt.save(prs, output_filename)
+        # Recorded once for the downloads' Last-Modified header
+        ppt_mtime = os.path.getmtime(ppt_path)
         
         # Complete
-        print(f"\n{'='*60}", flush=True)
-        print(f"[Task {task_id}] PPT 生成完成!", flush=True)
-        print(f"[Task {task_id}] 输出文件: {ppt_path}", flush=True)
-        print(f"{'='*60}\n", flush=True)
-        
-        tasks[task_id]['status'] = 'completed'
-        tasks[task_id]['progress'] = '完成！'
-        tasks[task_id]['result'] = {
-            'ppt_path': ppt_path,
-            'ppt_filename': f"{output_filename}.pptx",
-            'slides_count': len(slides),
-            'slides': [{'title': s.get('title', ''), 'content': s.get('content', '')} for s in slides]
-        }
+        logger.info("\n" + "=" * 60)
+        logger.info("[Task %s] PPT 生成完成!", task_id)
+        logger.info("[Task %s] 输出文件: %s", task_id, ppt_path)
+        logger.info("=" * 60 + "\n")
+        
+        tasks.update(
+            task_id,
+            status='completed',
+            progress='完成！',
+            result={
+                'ppt_path': ppt_path,
+                'ppt_filename': f"{output_filename}.pptx",
+                'mtime': ppt_mtime,
+                'slides_count': len(slides),
+                'slides': [{'title': s.get('title', ''), 'content': s.get('content', '')} for s in slides]
+            }
+        )
         
     except Exception as e:
-        tasks[task_id]['status'] = 'failed'
-        tasks[task_id]['error'] = str(e)
+        logger.exception("[Task %s] PPT 生成失败", task_id)
+        tasks.update(task_id, status='failed', error=str(e))
 
 
 @app.route('/')
@@ -110,27 +297,36 @@ def generate():
     if not text.strip():
         return jsonify({'error': 'Text content is required'}), 400
     
+    # Reject bad slide counts before queueing any work; int() would accept
+    # true as 1 and truncate 2.9 to 2
+    if isinstance(num_slides, bool) or (isinstance(num_slides, float) and not num_slides.is_integer()):
+        return jsonify({'error': 'num_slides must be an integer'}), 400
+    try:
+        num_slides = int(num_slides)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({'error': 'num_slides must be an integer'}), 400
+    if not MIN_SLIDES <= num_slides <= MAX_SLIDES:
+        return jsonify({'error': f'num_slides must be between {MIN_SLIDES} and {MAX_SLIDES}'}), 400
+    
     # Create task
-    task_id = str(uuid.uuid4())[:8]
-    tasks[task_id] = {
+    task_id = secrets.token_urlsafe(6)
+    preview = text if len(text) <= 100 else f"{text[:100]}..."
+    task = {
         'id': task_id,
         'status': 'pending',
         'progress': 'Starting...',
         'created_at': datetime.now().isoformat(),
         'params': {
-            'text': text[:100] + '...' if len(text) > 100 else text,
+            'text': preview,
             'num_slides': num_slides,
             'language': language,
             'style': style
         }
     }
+    tasks.set(task_id, task)
     
     # Start background task
-    thread = threading.Thread(
-        target=generate_ppt_task,
-        args=(task_id, text, num_slides, language, style)
-    )
-    thread.start()
+    _executor.submit(generate_ppt_task, task_id, text, num_slides, language, style)
     
     return jsonify({'task_id': task_id, 'status': 'pending'})
 
@@ -138,38 +334,57 @@ def generate():
 @app.route('/api/status/<task_id>')
 def get_status(task_id):
     """Get task status."""
-    if task_id not in tasks:
+    task = tasks.get(task_id)
+    if task is None:
         return jsonify({'error': 'Task not found'}), 404
-    return jsonify(tasks[task_id])
+    
+    # Pollers get a bodyless 304 until the status or progress message changes
+    etag = hashlib.md5(f"{task['status']}|{task['progress']}".encode('utf-8')).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(task)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/api/download/<task_id>')
 def download(task_id):
     """Download generated PPT."""
-    if task_id not in tasks:
+    task = tasks.get(task_id)
+    if task is None:
         return jsonify({'error': 'Task not found'}), 404
     
-    task = tasks[task_id]
     if task['status'] != 'completed':
         return jsonify({'error': 'PPT not ready yet'}), 400
     
-    ppt_path = task['result']['ppt_path']
-    if not os.path.exists(ppt_path):
+    # send_file stats the path itself, so a missing file surfaces here
+    try:
+        return send_file(
+            task['result']['ppt_path'],
+            mimetype=PPTX_MIMETYPE,
+            as_attachment=True,
+            download_name=task['result']['ppt_filename'],
+            conditional=True,
+            etag=True,
+            last_modified=task['result']['mtime']
+        )
+    except FileNotFoundError:
         return jsonify({'error': 'File not found'}), 404
-    
-    return send_file(
-        ppt_path,
-        as_attachment=True,
-        download_name=task['result']['ppt_filename']
-    )
 
 
 @app.route('/api/tasks')
 def list_tasks():
     """List all tasks."""
-    return jsonify(list(tasks.values()))
+    return jsonify(tasks.values())
 
 
 if __name__ == '__main__':
     os.makedirs('static', exist_ok=True)
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    if os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true'):
+        # Development server; the reloader would import the clients twice
+        app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
+    else:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=5000, threads=16)